@@ -7,7 +7,8 @@ It reads a template file with component references and replaces them with
 the actual content from component files.
 
 Usage:
-    python build-modular-prompt.py <agent-name> [options]
+    python build-modular-prompt.py <agent-name> [<agent-name> ...] [options]
+    python build-modular-prompt.py --all [options]
 
 Arguments:
     agent-name          Name of the agent folder (e.g., web-search-agent, data-processor)
@@ -16,22 +17,291 @@ Options:
     --template FILE     Template file with references (default: agent_prompt_modular.xml)
     --output FILE       Output file for assembled prompt (default: agent_prompt.xml)
     --parts-dir DIR     Directory containing component files (default: prompt-parts)
-    --validate          Validate XML syntax after assembly
+    --validate          Validate XML syntax during assembly (uses lxml if installed)
     --verbose           Show detailed processing information
+    --all               Build every agent under modules/ that has the template file
+
+When more than one agent is given (or --all is used), the agents are built
+in parallel, one process per CPU, and a summary is printed at the end.
 
 Examples:
     python build-modular-prompt.py web-search-agent
     python build-modular-prompt.py data-processor --validate --verbose
     python build-modular-prompt.py web-search-agent --template custom_template.xml
+    python build-modular-prompt.py web-search-agent data-processor --validate
+    python build-modular-prompt.py --all --validate
 """
 
+import io
 import os
-import re
+import mmap
 import sys
+import marshal
+import shutil
+import functools
 import argparse
-import xml.etree.ElementTree as ET
+import contextlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from xml.sax import SAXParseException, make_parser
+from xml.sax.handler import ContentHandler, feature_namespaces
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+# lxml (libxml2) validates faster than the stdlib parser; use it when installed
+try:
+    from lxml import etree as LET
+except ImportError:
+    LET = None
+
+# (component_path, description) pair taken from a template reference
+ComponentRef = Tuple[str, str]
+# Literal template bytes followed by the reference that comes after them, if any
+Segment = Tuple[bytes, Optional[ComponentRef]]
+# (relative_path, full_path, stat_or_None) for a resolved reference
+ResolvedComponent = Tuple[str, Path, Optional[os.stat_result]]
+
+# Bump when the layout of the template cache changes
+TEMPLATE_CACHE_VERSION = 5
+
+# Components larger than this skip the in-memory cache and are copied file to file
+INLINE_COMPONENT_LIMIT = 256 * 1024
+
+# Bytes read to look for an XML declaration at the start of large components
+XML_DECL_PEEK = 128
+
+# Outputs expected to be at least this large get their space reserved up front
+PREALLOCATE_THRESHOLD = 1 << 20
+
+# Threads used to read small components ahead of the write pass
+PREFETCH_WORKERS = 8
+
+# How many references ahead of the writer small components are read
+PREFETCH_WINDOW = 2 * PREFETCH_WORKERS
+
+REFERENCE_OPEN = b'<!-- REFERENCE: '
+COMMENT_OPEN = b'<!-- '
+COMMENT_CLOSE = b' -->'
+
+# Most whitespace allowed between a REFERENCE comment and its description
+MAX_REFERENCE_GAP = 64
+
+
+def _comment_body_end(buf: Union[bytes, mmap.mmap], start: int, gt: int) -> int:
+    """
+    Check the comment body that runs from start up to the '>' at gt.
+    
+    The body must be non-empty and followed by ' -->', mirroring the old
+    '([^>]+) -->' pattern.
+    
+    Returns:
+        Index where ' -->' begins, or -1 if the comment is malformed
+    """
+    body_end = gt - len(COMMENT_CLOSE) + 1
+    if body_end <= start or buf[body_end:gt + 1] != COMMENT_CLOSE:
+        return -1
+    return body_end
+
+
+def _iter_refs(buf: Union[bytes, mmap.mmap]) -> Iterator[Tuple[int, int, str, str]]:
+    """
+    Scan a template for component references in a single forward pass.
+    
+    A reference is a '<!-- REFERENCE: path -->' comment followed, after at
+    most MAX_REFERENCE_GAP spaces, tabs or newlines, by a
+    '<!-- description -->' comment.
+    
+    A comment body can't contain '>', so every candidate starting before the
+    first '>' after a failed one would fail the same way. The search resumes
+    past that '>', which keeps the scan linear even on malformed templates.
+    
+    Args:
+        buf: Raw template bytes or a memory map of the template file
+        
+    Yields:
+        Tuples of (start, end, component_path, description)
+    """
+    pos = buf.find(REFERENCE_OPEN)
+    while pos != -1:
+        path_start = pos + len(REFERENCE_OPEN)
+        path_gt = buf.find(b'>', path_start)
+        if path_gt == -1:
+            # Nothing after this point can close a reference
+            return
+        
+        resume = path_gt + 1
+        path_end = _comment_body_end(buf, path_start, path_gt)
+        if path_end != -1:
+            desc_open = path_gt + 1
+            gap_end = min(len(buf), desc_open + MAX_REFERENCE_GAP)
+            while desc_open < gap_end and buf[desc_open] in b' \t\r\n':
+                desc_open += 1
+            if buf[desc_open:desc_open + len(COMMENT_OPEN)] == COMMENT_OPEN:
+                desc_start = desc_open + len(COMMENT_OPEN)
+                desc_gt = buf.find(b'>', desc_start)
+                if desc_gt != -1:
+                    desc_end = _comment_body_end(buf, desc_start, desc_gt)
+                    if desc_end != -1:
+                        yield (
+                            pos,
+                            desc_gt + 1,
+                            buf[path_start:path_end].decode('utf-8').strip(),
+                            buf[desc_start:desc_end].decode('utf-8').strip(),
+                        )
+                        resume = desc_gt + 1
+        
+        pos = buf.find(REFERENCE_OPEN, resume)
+
+
+def _reference_header(component_path: str, description: str, newline: str = '\n') -> bytes:
+    """Build the comments written in front of an inlined component, ending lines with newline."""
+    return f"<!-- {description} -->{newline}<!-- SOURCE: {component_path} -->{newline}".encode('utf-8')
+
+
+def _xml_declaration_end(data: bytes) -> int:
+    """
+    Find where a leading '<?xml ...?>' declaration line ends.
+    
+    Only the first line is inspected, so the cost doesn't depend on the size
+    of the data.
+    
+    Args:
+        data: Start of a component file
+        
+    Returns:
+        Offset just past the declaration line, or 0 if there is none
+    """
+    newline = data.find(b'\n')
+    line_end = len(data) if newline == -1 else newline + 1
+    if data[:line_end].strip().startswith(b'<?xml'):
+        return line_end
+    return 0
+
+
+@functools.lru_cache(maxsize=256)
+def _load_component_bytes(full_path: str, mtime_ns: int, size: int) -> bytes:
+    """
+    Read a component file with its XML declaration removed.
+    
+    The mtime and size are part of the cache key, so an edited component is
+    re-read while unchanged ones are served from memory.
+    
+    Args:
+        full_path: Path to the component file
+        mtime_ns: Modification time of the file in nanoseconds
+        size: Size of the file in bytes
+        
+    Returns:
+        Component content as bytes
+    """
+    with open(full_path, 'rb') as f:
+        content = f.read()
+    
+    # Remove XML declaration from component files
+    declaration_end = _xml_declaration_end(content)
+    return content[declaration_end:] if declaration_end else content
+
+
+class PromptWriter:
+    """Binary writer for the assembled prompt that counts the bytes written."""
+    
+    def __init__(self, out: io.BufferedWriter):
+        self.out = out
+        self.bytes_written = 0
+    
+    def write(self, data: bytes) -> int:
+        """Write data to the output."""
+        self.bytes_written += len(data)
+        return self.out.write(data)
+    
+    def copy_from(self, src: BinaryIO) -> None:
+        """
+        Copy the rest of src into the output, in-kernel when possible.
+        
+        Uses os.copy_file_range and falls back to a chunked userspace copy on
+        other platforms or when the filesystem refuses.
+        
+        Args:
+            src: Binary file opened for reading, positioned at the data to copy
+        """
+        if hasattr(os, 'copy_file_range'):
+            # Pending buffered bytes must reach the fd before the kernel appends to it
+            self.out.flush()
+            start = offset = src.tell()
+            try:
+                while True:
+                    copied = os.copy_file_range(src.fileno(), self.out.fileno(), 1 << 30, offset_src=offset)
+                    if not copied:
+                        # Some kernels/filesystems return 0 up front instead of failing, so
+                        # only trust EOF once the kernel has copied something
+                        if offset == start:
+                            break
+                        return
+                    offset += copied
+                    self.bytes_written += copied
+            except OSError:
+                # e.g. EXDEV or ENOSYS: finish with a userspace copy from where we stopped
+                pass
+            src.seek(offset)
+        
+        shutil.copyfileobj(src, self, length=1 << 20)
+
+
+class ValidatingPromptWriter(PromptWriter):
+    """Prompt writer that also checks XML well-formedness of everything written."""
+    
+    def __init__(self, out: io.BufferedWriter):
+        super().__init__(out)
+        self.error: Optional[str] = None
+        
+        if LET is not None:
+            # A pull parser keeps lxml's namespace checks, which a custom target would skip
+            self.parser = LET.XMLPullParser(events=('end',), huge_tree=True, collect_ids=False)
+            self.parse_errors = (LET.XMLSyntaxError,)
+        else:
+            # SAX with a no-op handler: expat checks the input, nothing is kept
+            self.parser = make_parser()
+            self.parser.setContentHandler(ContentHandler())
+            # Namespace processing makes undeclared prefixes an error, as in ElementTree
+            self.parser.setFeature(feature_namespaces, True)
+            self.parse_errors = (SAXParseException,)
+    
+    def write(self, data: bytes) -> int:
+        """Write data to the output and feed it to the parser."""
+        if self.error is None:
+            try:
+                self.parser.feed(data)
+                if LET is not None:
+                    # Drop finished elements so no document tree builds up
+                    for _, element in self.parser.read_events():
+                        element.clear()
+            except self.parse_errors as e:
+                self.error = self._format_error(e)
+        return super().write(data)
+    
+    def copy_from(self, src: BinaryIO) -> None:
+        """Copy the rest of src through the parser; the bytes can't bypass userspace."""
+        shutil.copyfileobj(src, self, length=1 << 20)
+    
+    @staticmethod
+    def _format_error(error: Exception) -> str:
+        """Describe a parse error, with its position for SAX errors."""
+        if isinstance(error, SAXParseException):
+            return f"{error.getMessage()}: line {error.getLineNumber()}, column {error.getColumnNumber()}"
+        return str(error)
+    
+    def validate(self) -> Tuple[bool, Optional[str]]:
+        """
+        Finish parsing and report whether the written content is well-formed.
+        
+        Returns:
+            Tuple of (is_valid, error_message)
+        """
+        if self.error is None:
+            try:
+                self.parser.close()
+            except self.parse_errors as e:
+                self.error = self._format_error(e)
+        return self.error is None, self.error
 
 
 class ModularPromptBuilder:
@@ -43,29 +313,58 @@ class ModularPromptBuilder:
         self.template_file = self.agent_dir / template_file
         self.output_file = self.agent_dir / output_file
         self.parts_dir = self.agent_dir / parts_dir
+        self.cache_file = self.agent_dir / ".template.cache"
         self.verbose = verbose
-        
-        # Reference pattern: <!-- REFERENCE: path/to/file.xml -->
-        # Description pattern: <!-- Description of component -->
-        self.reference_pattern = re.compile(
-            r'<!-- REFERENCE: ([^>]+) -->\s*<!-- ([^>]+) -->',
-            re.MULTILINE | re.DOTALL
-        )
+        self._ref_count = 0
+        self._component_index: Dict[str, os.DirEntry] = {}
+        self._prefetched: Dict[int, Future] = {}
+        self._next_prefetch = 0
+        self._newline = '\n'
+        self.bytes_written = 0
     
     def log(self, message: str) -> None:
         """Log message if verbose mode is enabled."""
         if self.verbose:
             print(f"[BUILD] {message}")
     
-    def read_component(self, component_path: str) -> Tuple[str, bool]:
+    def _scan_parts_dir(self) -> Dict[str, os.DirEntry]:
+        """
+        Index every file under the parts directory by its relative path.
+        
+        Symlinked and unreadable directories are not indexed; references into
+        them fall back to a direct stat when resolved.
+        
+        Returns:
+            Mapping of normalized relative path to directory entry
+        """
+        index: Dict[str, os.DirEntry] = {}
+        pending = ['']
+        while pending:
+            rel_dir = pending.pop()
+            try:
+                with os.scandir(self.parts_dir / rel_dir) as entries:
+                    for entry in entries:
+                        rel_path = os.path.join(rel_dir, entry.name)
+                        # Symlinked directories aren't walked; their files resolve by stat
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(rel_path)
+                        else:
+                            index[rel_path] = entry
+            except OSError as e:
+                # Unreadable directories are left to the per-reference fallback
+                self.log(f"Skipping unreadable directory {rel_dir or '.'}: {str(e)}")
+        return index
+    
+    def _resolve_component(self, component_path: str) -> ResolvedComponent:
         """
-        Read component file and return content with XML declaration removed.
+        Resolve a template reference to its component file.
         
         Args:
-            component_path: Relative path to component file
+            component_path: Component path as written in the template
             
         Returns:
-            Tuple of (content, success_flag)
+            Tuple of (relative_path, full_path, stat), where stat is None if
+            the file does not exist
         """
         # Remove parts-dir prefix if it's already in the component_path
         if component_path.startswith(self.parts_dir.name + "/"):
@@ -73,75 +372,255 @@ class ModularPromptBuilder:
         
         full_path = self.parts_dir / component_path
         
-        if not full_path.exists():
+        # Paths outside the parts directory (e.g. shared ../ components) aren't indexed
+        entry = self._component_index.get(os.path.normpath(component_path))
+        
+        try:
+            stat = entry.stat() if entry is not None else full_path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            stat = None
+        
+        return component_path, full_path, stat
+    
+    def _resolve_references(self, segments: List[Segment]) -> List[ResolvedComponent]:
+        """
+        Resolve every reference in the template once, in order.
+        
+        Args:
+            segments: Template segments from _segment_template
+            
+        Returns:
+            Resolved component for each reference
+        """
+        return [self._resolve_component(ref[0]) for _, ref in segments if ref is not None]
+    
+    def _plan_prefetch(self, resolved: List[ResolvedComponent]) -> List[Optional[Tuple[str, int, int]]]:
+        """
+        Work out which references can be read ahead of the write pass.
+        
+        Args:
+            resolved: Resolved components from _resolve_references
+            
+        Returns:
+            For each reference in order, the _load_component_bytes arguments
+            for a small existing component, or None
+        """
+        plan: List[Optional[Tuple[str, int, int]]] = []
+        for _, full_path, stat in resolved:
+            if stat is not None and stat.st_size <= INLINE_COMPONENT_LIMIT:
+                plan.append((str(full_path), stat.st_mtime_ns, stat.st_size))
+            else:
+                plan.append(None)
+        return plan
+    
+    def _prefetch_ahead(self, plan: List[Optional[Tuple[str, int, int]]], index: int,
+                        pool: ThreadPoolExecutor) -> None:
+        """
+        Start reading components for the references just ahead of the writer.
+        
+        Only references in [index, index + PREFETCH_WINDOW) are submitted, so at
+        most PREFETCH_WINDOW component bodies are held by pending futures.
+        
+        Args:
+            plan: Prefetch plan from _plan_prefetch
+            index: Index of the reference about to be written
+            pool: Executor to submit the reads to
+        """
+        window_end = min(index + PREFETCH_WINDOW, len(plan))
+        for position in range(max(self._next_prefetch, index), window_end):
+            args = plan[position]
+            if args is None:
+                continue
+            # Share the read with an earlier pending reference to the same file
+            shared = next(
+                (future for pending, future in self._prefetched.items() if plan[pending][0] == args[0]),
+                None
+            )
+            self._prefetched[position] = shared or pool.submit(_load_component_bytes, *args)
+        self._next_prefetch = max(self._next_prefetch, window_end)
+    
+    def _estimate_output_size(self, segments: List[Segment], resolved: List[ResolvedComponent]) -> int:
+        """
+        Estimate the assembled prompt size from the segments and file sizes.
+        
+        Component sizes still include any XML declaration, so the estimate
+        is usually slightly high; the output is truncated after writing.
+        
+        Args:
+            segments: Template segments from _segment_template
+            resolved: Resolved components from _resolve_references
+            
+        Returns:
+            Estimated output size in bytes
+        """
+        total = sum(len(literal) for literal, _ in segments)
+        refs = (ref for _, ref in segments if ref is not None)
+        for ref, (_, _, stat) in zip(refs, resolved):
+            total += len(_reference_header(ref[0], ref[1], self._newline))
+            if stat is not None:
+                total += stat.st_size
+        return total
+    
+    def _preallocate(self, f: io.BufferedWriter, size: int) -> bool:
+        """
+        Reserve disk space for the output so the filesystem can allocate it in one go.
+        
+        Args:
+            f: Output file
+            size: Number of bytes to reserve
+            
+        Returns:
+            True if the space was reserved, False if it was skipped or unsupported
+        """
+        if size < PREALLOCATE_THRESHOLD or not hasattr(os, 'posix_fallocate'):
+            return False
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except OSError as e:
+            self.log(f"Could not preallocate output: {str(e)}")
+            return False
+        self.log(f"Preallocated {size:,} bytes for output")
+        return True
+    
+    def stream_component(self, component_path: str, out: PromptWriter,
+                         resolved: Optional[ResolvedComponent] = None) -> bool:
+        """
+        Write component content into the output with XML declaration removed.
+        
+        Args:
+            component_path: Relative path to component file
+            out: Prompt writer to write the component into
+            resolved: Result of resolving component_path, if already known
+            
+        Returns:
+            True if the component was written, False otherwise
+        """
+        if resolved is None:
+            resolved = self._resolve_component(component_path)
+        component_path, full_path, stat = resolved
+        
+        if stat is None:
             error_msg = f"ERROR: Component file not found: {full_path}"
             self.log(error_msg)
-            return f"<!-- {error_msg} -->", False
+            out.write(f"<!-- {error_msg} -->".encode('utf-8'))
+            return False
         
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Remove XML declaration from component files
-            lines = content.split('\n')
-            if lines and lines[0].strip().startswith('<?xml'):
-                content = '\n'.join(lines[1:])
+            if stat.st_size > INLINE_COMPONENT_LIMIT:
+                with open(full_path, 'rb') as f:
+                    # Skip the XML declaration so the copy starts at the content
+                    head = f.read(XML_DECL_PEEK)
+                    declaration_end = _xml_declaration_end(head)
+                    f.seek(declaration_end)
+                    if declaration_end == len(head) and not head.endswith(b'\n'):
+                        f.readline()
+                    out.copy_from(f)
+            else:
+                # Futures are keyed by reference index and dropped once written
+                future = self._prefetched.pop(self._ref_count - 1, None)
+                if future is not None:
+                    out.write(future.result())
+                else:
+                    out.write(_load_component_bytes(str(full_path), stat.st_mtime_ns, stat.st_size))
             
             self.log(f"Successfully read component: {component_path}")
-            return content, True
+            return True
             
         except Exception as e:
             error_msg = f"ERROR: Failed to read {component_path}: {str(e)}"
             self.log(error_msg)
-            return f"<!-- {error_msg} -->", False
+            out.write(f"<!-- {error_msg} -->".encode('utf-8'))
+            return False
     
-    def replace_reference(self, match: re.Match) -> str:
+    def write_replacement(self, ref: ComponentRef, out: PromptWriter,
+                          resolved: Optional[ResolvedComponent] = None) -> bool:
         """
-        Replace a single reference with component content.
+        Write the replacement for a single reference to the output.
         
         Args:
-            match: Regex match object containing reference and description
+            ref: Component path and description taken from the template
+            out: Prompt writer for the assembled output
+            resolved: Result of resolving the component path, if already known
             
         Returns:
-            Replacement text with component content
+            True if the component content was written, False otherwise
         """
-        component_path = match.group(1).strip()
-        description = match.group(2).strip()
+        component_path, description = ref
         
         self.log(f"Processing reference: {component_path}")
         
-        # Read component content
-        content, success = self.read_component(component_path)
+        # Write header comments, then stream component content
+        out.write(_reference_header(component_path, description, self._newline))
         
-        # Build replacement text
-        replacement = f"<!-- {description} -->\n"
-        replacement += f"<!-- SOURCE: {component_path} -->\n"
-        replacement += content
-        
-        return replacement
+        return self.stream_component(component_path, out, resolved)
     
-    def validate_xml(self, content: str) -> Tuple[bool, Optional[str]]:
+    def _segment_template(self) -> List[Segment]:
         """
-        Validate XML syntax of the assembled content.
+        Split the template into literal byte slices and component references.
+        
+        The result is stored next to the template with marshal (plain data
+        only, so a planted cache file can't run code) and reused as long as
+        the same template file is unchanged, so repeated builds skip the scan
+        entirely.
         
-        Args:
-            content: XML content to validate
-            
         Returns:
-            Tuple of (is_valid, error_message)
+            List of (literal_bytes, reference_or_None) segments
         """
+        stat = self.template_file.stat()
+        cache_key = (TEMPLATE_CACHE_VERSION, str(self.template_file.resolve()), stat.st_mtime_ns, stat.st_size)
+        
+        try:
+            with open(self.cache_file, 'rb') as f:
+                cached_key, newline, segments = marshal.load(f)
+            if cached_key == cache_key:
+                self.log(f"Using cached template segments: {self.cache_file}")
+                self._newline = newline
+                return segments
+        except Exception:
+            pass
+        
+        segments: List[Segment] = []
+        newline = '\n'
+        with open(self.template_file, 'rb') as f:
+            if stat.st_size == 0:
+                segments.append((b'', None))
+            else:
+                # Scan the mapped file directly; only the literal slices are copied
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as template_map:
+                    # Headers follow the template's line endings (from its first line)
+                    first_newline = template_map.find(b'\n')
+                    if first_newline > 0 and template_map[first_newline - 1] == ord('\r'):
+                        newline = '\r\n'
+                    
+                    last_end = 0
+                    for start, end, component_path, description in _iter_refs(template_map):
+                        segments.append((template_map[last_end:start], (component_path, description)))
+                        last_end = end
+                    segments.append((template_map[last_end:], None))
+        
         try:
-            ET.fromstring(content)
-            return True, None
-        except ET.ParseError as e:
-            return False, str(e)
+            with open(self.cache_file, 'wb') as f:
+                marshal.dump((cache_key, newline, segments), f)
+        except Exception as e:
+            self.log(f"Could not write template cache: {str(e)}")
+        
+        self._newline = newline
+        return segments
     
     def build(self, validate: bool = False) -> bool:
         """
         Build the final prompt from template and components.
         
+        The template is streamed to disk slice by slice. Large components are
+        copied file to file; small ones are read by a thread pool at most
+        PREFETCH_WINDOW references ahead of the writer and released once
+        written, though recently used ones also stay in the component cache
+        (up to 256 entries of at most INLINE_COMPONENT_LIMIT bytes). Output
+        goes to a temporary file that replaces the target only once the build
+        (and validation) succeeds.
+        
         Args:
-            validate: Whether to validate XML syntax after assembly
+            validate: Whether to validate XML syntax while writing
             
         Returns:
             True if build was successful, False otherwise
@@ -156,49 +635,128 @@ class ModularPromptBuilder:
             print(f"ERROR: Parts directory not found: {self.parts_dir}")
             return False
         
+        # Index component files up front so each reference is a dict lookup
+        self._component_index = self._scan_parts_dir()
+        
         self.log(f"Reading template: {self.template_file}")
         
-        # Read template content
+        # Split template into literal slices and references
         try:
-            with open(self.template_file, 'r', encoding='utf-8') as f:
-                template_content = f.read()
+            segments = self._segment_template()
         except Exception as e:
             print(f"ERROR: Failed to read template file: {str(e)}")
             return False
         
-        # Find and count references
-        references = self.reference_pattern.findall(template_content)
-        self.log(f"Found {len(references)} component references")
+        if validate:
+            self.log("Validating XML syntax...")
         
-        if not references:
-            print("WARNING: No component references found in template")
+        # Stream literal segments and component content to a temporary file
+        tmp_file = self.output_file.with_name(self.output_file.name + '.tmp')
+        try:
+            # Ensure output directory exists
+            self.output_file.parent.mkdir(parents=True, exist_ok=True)
+            
+            with open(tmp_file, 'wb', buffering=4 * 1024 * 1024) as f, \
+                    ThreadPoolExecutor(max_workers=PREFETCH_WORKERS) as pool:
+                # Component reads overlap with writing the template
+                # Each reference is resolved once and reused by every step below
+                resolved = self._resolve_references(segments)
+                plan = self._plan_prefetch(resolved)
+                self._prefetched = {}
+                self._next_prefetch = 0
+                
+                # Validation runs on the fly as content is written; without it
+                # the plain writer never looks at the bytes
+                out = ValidatingPromptWriter(f) if validate else PromptWriter(f)
+                preallocated = self._preallocate(f, self._estimate_output_size(segments, resolved))
+                
+                # References are counted in the same pass that writes them
+                self._ref_count = 0
+                for literal, ref in segments:
+                    out.write(literal)
+                    if ref is not None:
+                        self._prefetch_ahead(plan, self._ref_count, pool)
+                        self._ref_count += 1
+                        self.write_replacement(ref, out, resolved[self._ref_count - 1])
+                
+                # Drop whatever part of the reservation wasn't used
+                if preallocated:
+                    f.flush()
+                    os.ftruncate(f.fileno(), out.bytes_written)
+        except Exception as e:
+            tmp_file.unlink(missing_ok=True)
+            print(f"ERROR: Failed to write output file: {str(e)}")
+            return False
+        finally:
+            self._prefetched = {}
+        
+        self.bytes_written = out.bytes_written
+        self.log(f"Found {self._ref_count} component references")
         
-        # Replace all references with component content
-        final_content = self.reference_pattern.sub(self.replace_reference, template_content)
+        if not self._ref_count:
+            print("WARNING: No component references found in template")
         
         # Validate XML if requested
         if validate:
-            self.log("Validating XML syntax...")
-            is_valid, error_msg = self.validate_xml(final_content)
+            is_valid, error_msg = out.validate()
             if not is_valid:
+                tmp_file.unlink(missing_ok=True)
                 print(f"ERROR: XML validation failed: {error_msg}")
                 return False
             self.log("XML validation passed")
         
-        # Write final content
         try:
-            # Ensure output directory exists
-            self.output_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                f.write(final_content)
-            
-            self.log(f"Successfully wrote final prompt: {self.output_file}")
-            return True
-            
+            os.replace(tmp_file, self.output_file)
         except Exception as e:
+            tmp_file.unlink(missing_ok=True)
             print(f"ERROR: Failed to write output file: {str(e)}")
             return False
+        
+        self.log(f"Successfully wrote final prompt: {self.output_file}")
+        return True
+
+
+def _build_one(agent_name: str, template_file: str, output_file: str, parts_dir: str,
+               validate: bool, verbose: bool) -> Tuple[str, bool, int, List[str]]:
+    """
+    Build a single agent prompt; used as the worker for batch builds.
+    
+    The builder's messages are captured rather than printed, so output from
+    parallel workers doesn't interleave and can be attributed to the agent.
+    
+    Returns:
+        Tuple of (agent_name, success, bytes_written, messages)
+    """
+    builder = ModularPromptBuilder(
+        agent_name=agent_name,
+        template_file=template_file,
+        output_file=output_file,
+        parts_dir=parts_dir,
+        verbose=verbose
+    )
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(messages):
+        success = builder.build(validate=validate)
+    return agent_name, success, builder.bytes_written, messages.getvalue().splitlines()
+
+
+def discover_agents(template_file: str) -> List[str]:
+    """
+    Find every agent folder under modules/ that contains the template file.
+    
+    Args:
+        template_file: Template file name to look for
+        
+    Returns:
+        Sorted list of agent names
+    """
+    modules_dir = Path("modules")
+    if not modules_dir.is_dir():
+        return []
+    return sorted(
+        entry.name for entry in os.scandir(modules_dir)
+        if entry.is_dir() and (Path(entry.path) / template_file).is_file()
+    )
 
 
 def main():
@@ -211,11 +769,14 @@ Examples:
   python build-modular-prompt.py web-search-agent
   python build-modular-prompt.py data-processor --validate --verbose
   python build-modular-prompt.py web-search-agent --template custom_template.xml
+  python build-modular-prompt.py web-search-agent data-processor --validate
+  python build-modular-prompt.py --all --validate
         """
     )
     
     parser.add_argument(
         'agent_name',
+        nargs='*',
         help='Name of the agent folder (e.g., web-search-agent, data-processor)'
     )
     
@@ -240,7 +801,7 @@ Examples:
     parser.add_argument(
         '--validate',
         action='store_true',
-        help='Validate XML syntax after assembly'
+        help='Validate XML syntax during assembly'
     )
     
     parser.add_argument(
@@ -249,11 +810,35 @@ Examples:
         help='Show detailed processing information'
     )
     
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Build every agent under modules/ that has the template file'
+    )
+    
     args = parser.parse_args()
     
+    if args.all and args.agent_name:
+        parser.error("--all cannot be combined with agent names")
+    
+    agent_names = discover_agents(args.template) if args.all else args.agent_name
+    # Repeated names would make two workers write the same output file
+    agent_names = list(dict.fromkeys(agent_names))
+    if not agent_names:
+        if args.all:
+            print(f"ERROR: No agents with {args.template} found under modules/")
+            sys.exit(1)
+        parser.error("at least one agent name is required (or use --all)")
+    
+    if len(agent_names) > 1 or args.all:
+        build_batch(agent_names, args)
+        return
+    
+    agent_name = agent_names[0]
+    
     # Create builder instance
     builder = ModularPromptBuilder(
-        agent_name=args.agent_name,
+        agent_name=agent_name,
         template_file=args.template,
         output_file=args.output,
         parts_dir=args.parts_dir,
@@ -261,7 +846,7 @@ Examples:
     )
     
     # Build the prompt
-    print(f"Building modular prompt for agent: {args.agent_name}")
+    print(f"Building modular prompt for agent: {agent_name}")
     print(f"  Template: {args.template}")
     print(f"  Output: {args.output}")
     print(f"  Parts Directory: {args.parts_dir}")
@@ -272,14 +857,60 @@ Examples:
         print("✓ Build completed successfully!")
         
         # Show final stats
-        output_path = Path("modules") / args.agent_name / args.output
-        if output_path.exists():
-            size = output_path.stat().st_size
-            print(f"  Final prompt size: {size:,} bytes")
+        print(f"  Final prompt size: {builder.bytes_written:,} bytes")
     else:
         print("✗ Build failed!")
         sys.exit(1)
 
 
+def build_batch(agent_names: List[str], args: argparse.Namespace) -> None:
+    """
+    Build several agents in parallel worker processes and print a summary.
+    
+    Args:
+        agent_names: Agents to build
+        args: Parsed command line options shared by all builds
+    """
+    print(f"Building modular prompts for {len(agent_names)} agents")
+    print(f"  Template: {args.template}")
+    print(f"  Output: {args.output}")
+    print(f"  Parts Directory: {args.parts_dir}")
+    
+    build = functools.partial(
+        _build_one,
+        template_file=args.template,
+        output_file=args.output,
+        parts_dir=args.parts_dir,
+        validate=args.validate,
+        verbose=args.verbose
+    )
+    
+    # Builds are independent, so each agent gets its own process
+    workers = min(os.cpu_count() or 1, len(agent_names))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(build, agent_names))
+    
+    # Show each agent's messages as one block, tagged with the agent name
+    for agent_name, _, _, messages in results:
+        for message in messages:
+            print(f"[{agent_name}] {message}")
+    
+    # Show summary
+    width = max(len(name) for name in agent_names)
+    print()
+    for agent_name, success, size, messages in results:
+        if success:
+            print(f"  ✓ {agent_name:<{width}}  {size:>12,} bytes")
+        else:
+            errors = [message for message in messages if message.startswith("ERROR:")]
+            reason = errors[-1] if errors else "failed"
+            print(f"  ✗ {agent_name:<{width}}  {reason}")
+    
+    failed = sum(1 for _, success, _, _ in results if not success)
+    if failed:
+        print(f"✗ {failed} of {len(results)} builds failed!")
+        sys.exit(1)
+    print(f"✓ All {len(results)} builds completed successfully!")
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()